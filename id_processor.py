@@ -1,27 +1,291 @@
 import pandas as pd
-import networkx as nx
+import numpy as np
 import hashlib
 import uuid
 from pathlib import Path
 import tempfile
 import os
 import shutil
-from typing import Dict, List, Set, Union
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Set, Union
 from tqdm import tqdm
-import time
-import gc
-import random
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to pandas' own CSV engine
+    pa = None
+    pc = None
+    pacsv = None
+    pq = None
+
+# Arrow writes CSV rows with "\n"; choosing the line ending needs pyarrow 26, so older
+# versions can only write files in pandas' format where that is the platform's line ending
+_ARROW_CSV_EOL = None
+if pacsv is not None:
+    try:
+        pacsv.WriteOptions(eol=os.linesep)
+        _ARROW_CSV_EOL = {'eol': os.linesep}
+    except TypeError:
+        _ARROW_CSV_EOL = {} if os.linesep == '\n' else None
+
+try:
+    import python_calamine  # noqa: F401
+    _XLSX_READ_ENGINE = 'calamine'
+except ImportError:  # python-calamine is optional; openpyxl reads .xlsx otherwise
+    _XLSX_READ_ENGINE = 'openpyxl'
+
+try:
+    import xlsxwriter  # noqa: F401
+    _XLSX_WRITE_ENGINE = 'xlsxwriter'
+except ImportError:
+    _XLSX_WRITE_ENGINE = 'openpyxl'
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:  # scipy is optional; NumPy label propagation finds ID components otherwise
+    connected_components = None
+
+try:
+    import blake3
+except ImportError:  # blake3 is optional; only needed for hash_algo='blake3'
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional; only needed for hash_algo='xxh3-128'
+    xxhash = None
+
+# Hash constructors by name. 'blake2b-128' and 'xxh3-128' give 32 hex characters and all others
+# 64; only the 64-character algorithms pass through values that already look like their hashes.
+_HASHERS = {
+    'sha256': hashlib.sha256,
+    'blake2b': lambda data: hashlib.blake2b(data, digest_size=32),
+    'blake2b-128': lambda data: hashlib.blake2b(data, digest_size=16),
+}
+if blake3 is not None:
+    _HASHERS['blake3'] = blake3.blake3
+if xxhash is not None:
+    # Not a cryptographic hash: fast pseudonyms, but IDs are easier to recover by guessing
+    _HASHERS['xxh3-128'] = xxhash.xxh3_128
+
+
+def _fsync_file(path: Path) -> None:
+    """Flush one file's contents to disk."""
+    # Opened for writing because Windows can only commit files open with write access
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def _component_roots(left: np.ndarray, right: np.ndarray, node_count: int) -> np.ndarray:
+    """Return, for every node 0..node_count-1, the smallest node in its connected component."""
+    nodes = np.arange(node_count)
+    if connected_components is not None:
+        graph = coo_matrix((np.ones(len(left), dtype=np.int8), (left, right)), shape=(node_count, node_count))
+        component_count, labels = connected_components(graph, directed=False)
+        roots = np.full(component_count, node_count)
+        np.minimum.at(roots, labels, nodes)
+        return roots[labels]
+    
+    # Min-label propagation: every edge pulls both ends down to the smaller label, and
+    # labels[labels] then shortcuts chains of labels, until nothing changes
+    labels = nodes
+    while True:
+        edge_labels = np.minimum(labels[left], labels[right])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, left, edge_labels)
+        np.minimum.at(new_labels, right, edge_labels)
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def _build_id_lookup(id_mapping: Dict[str, str], consent_status_mapping: Dict[str, str]) -> pd.DataFrame:
+    """Combine the ID and consent mappings into one table indexed by lookup key."""
+    # Keys mix plain IDs and (id_value, id_type[, source_context]) tuples, so the index is
+    # built with tupleize_cols=False instead of letting pandas turn the tuples into a MultiIndex.
+    # hashed_id is missing for keys that have a consent status but no hash.
+    keys = list(dict.fromkeys(itertools.chain(consent_status_mapping, id_mapping)))
+    return pd.DataFrame({
+        'hashed_id': np.array([id_mapping.get(key) for key in keys], dtype=object),
+        'consent_status': np.array([consent_status_mapping.get(key, 'ID not found') for key in keys], dtype=object),
+    }, index=pd.Index(keys, dtype=object, tupleize_cols=False))
+
+
+def _write_json(path: Path, data) -> None:
+    """Write data as JSON through a temporary file renamed into place.
+    
+    A crash mid-write leaves the previous file instead of a truncated one.
+    """
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, suffix='.json', prefix='.idp_tmp_')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_name, path)
+    finally:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+
+
+def _encode_mapping(mapping: Dict) -> List[list]:
+    """Return a mapping as JSON-ready [key, value] pairs; tuple keys become lists."""
+    return [[list(key) if isinstance(key, tuple) else key, value] for key, value in mapping.items()]
+
+
+def _decode_mapping(pairs: List[list]) -> Dict:
+    """Rebuild a mapping from _encode_mapping pairs, accepting nothing but text keys and values."""
+    mapping = {}
+    for key, value in pairs:
+        if isinstance(key, list) and all(type(part) is str for part in key):
+            key = tuple(key)
+        elif type(key) is not str:
+            raise ValueError(f"unexpected key {key!r}")
+        if type(value) is not str:
+            raise ValueError(f"unexpected value {value!r}")
+        mapping[key] = value
+    return mapping
+
+
+def _checkpoint_rows(mapping_df: pd.DataFrame) -> Iterator[tuple]:
+    """Return the (source_file, source_id) pair that identifies each mapping row in a checkpoint."""
+    return zip(mapping_df['source_file'].astype(str), mapping_df['source_id'].astype(str))
+
+
+def _context_parts(source_context) -> tuple:
+    """Return the key parts for a source context: empty unless it's provided and not empty."""
+    if source_context and str(source_context).strip() and str(source_context).lower() != 'nan':
+        return (str(source_context),)
+    return ()
+
+
+def _looks_like_hash(id_value: str, length: int = 64) -> bool:
+    """Check if a value already looks like a hash (length hex characters)."""
+    # bytes.fromhex validates in C without building a lowercase copy. It skips whitespace
+    # between digits, so isalnum() first rules out values such as 'ab cd ...'.
+    if len(id_value) != length or not id_value.isalnum():
+        return False
+    try:
+        bytes.fromhex(id_value)
+    except ValueError:
+        return False
+    return True
+
+
+class MappingResolver:
+    """Resolve IDs to people against one mapping table, with its indexes built once.
+    
+    The indexes and answers are a snapshot of the table when the resolver was built, so build
+    a new resolver (IDProcessor.build_resolver) after changing the table.
+    """
+
+    def __init__(self, mapping_table: pd.DataFrame):
+        self.mapping_table = mapping_table
+        # Rows are put in resolution order once: priority ascending (lower number = higher
+        # priority), then newest effective_date first. The stable sort keeps table order for
+        # ties, exactly as sorting each ID's records on its own would.
+        sort_columns = [col for col in ('priority', 'effective_date') if col in mapping_table.columns]
+        ordered = mapping_table.sort_values(sort_columns, ascending=[True, False][:len(sort_columns)], kind='stable')
+        # Row positions of every (id_value, id_type) pair in the ordered table, best record first
+        self._positions_by_id = ordered.groupby([ordered['id_value'].astype(str), 'id_type'], sort=False, observed=True).indices
+        self._person_by_row = ordered['person_id'].to_numpy(dtype=object)
+        # Missing contexts become None so comparing them with a context is simply False
+        self._context_by_row = ordered['source_context'].to_numpy(dtype=object, na_value=None)
+        # Consent status of each person's first record
+        first_records = mapping_table.drop_duplicates('person_id')
+        self._consent_by_person = dict(zip(first_records['person_id'].tolist(), first_records['consent_status'].tolist()))
+        # The same ID is often resolved again; answers, including "not found" (None), are remembered
+        self._resolved: Dict[tuple, str] = {}
+
+    def resolve_id_conflicts(self, id_value: str, id_type: str, source_context: str = None) -> str:
+        """Resolve conflicts when the same ID appears for multiple people."""
+        memo_key = (str(id_value), id_type, source_context)
+        if memo_key in self._resolved:
+            return self._resolved[memo_key]
+        
+        # Find records for this specific ID and type with one index probe instead of a full-column scan
+        positions = self._positions_by_id.get(memo_key[:2])
+        if positions is None:
+            self._resolved[memo_key] = None
+            return None
+        # The positions are already in priority/effective_date order, so the highest priority
+        # record is the first one; no per-ID sort is needed
+        best = positions[0]
+        
+        # If source_context is provided, prefer the best record with a matching context
+        if source_context and len(positions) > 1:
+            context_matches = positions[self._context_by_row[positions] == source_context]
+            if len(context_matches) > 0:
+                best = context_matches[0]
+        
+        person_id = self._person_by_row[best]
+        self._resolved[memo_key] = person_id
+        return person_id
+
+    def get_person_for_id(self, id_value: str, id_type: str, source_context: str = None) -> tuple:
+        """Get person_id and consent_status for a given ID in a specific context."""
+        person_id = self.resolve_id_conflicts(id_value, id_type, source_context)
+        
+        if person_id is None:
+            return None, 'ID not found'
+            
+        # Get consent status for this person
+        return person_id, self._consent_by_person.get(person_id, 'ID not found')
 
 
 class IDProcessor:
-    def __init__(self, progress_callback=None, status_callback=None):
+    # Number of rows held in memory at once when streaming CSV files with pandas
+    CSV_CHUNK_SIZE = 200_000
+    # Bytes of CSV parsed per batch when streaming with pyarrow
+    CSV_BLOCK_SIZE = 16 << 20
+    # Default hash used to anonymize IDs; one of the keys of _HASHERS. Keep 'sha256' to stay
+    # consistent with existing lookup tables and training files.
+    HASH_ALGO = 'sha256'
+    # Recognised consent values; anything else in a mapping table is treated as 'none'
+    CONSENT_STATUSES = ['granted', 'revoked', 'none', 'id not found']
+    # Columns required in the configuration (mapping) file
+    CONFIG_COLUMNS = ['mapping_file', 'mapping_id', 'source_file', 'source_id']
+    # Columns required in a person-centric mapping table
+    MAPPING_TABLE_COLUMNS = ['person_id', 'id_value', 'id_type', 'source_context', 'priority', 'consent_status']
+    # Version of the <mapping table>.idmap.json layout; bump it when the mappings change shape
+    ID_MAPPING_CACHE_VERSION = 1
+    # Columns of id_lookup_table.csv
+    LOOKUP_COLUMNS = ['person_id', 'original_id', 'hashed_id', 'consent_status', 'from_mapping', 'id_type', 'source_context', 'hash_algo']
+
+    def __init__(self, progress_callback=None, status_callback=None, load_lookup_table: bool = True, hash_algo: str = None,
+                 replace_lookup_table: bool = False):
+        """Set up the processor.
+        
+        An existing id_lookup_table.csv made with a different hash algorithm is the only record of
+        its pseudonyms, so it is refused with a ValueError unless replace_lookup_table is set, in
+        which case it is ignored and overwritten at the end of the run.
+        """
+        self.hash_algo = hash_algo or self.HASH_ALGO
+        if self.hash_algo not in _HASHERS:
+            raise ValueError(f"Unsupported hash algorithm: {self.hash_algo}")
+        self._hasher = _HASHERS[self.hash_algo]
+        # Values of the digest's length in hex are taken to be hashed already and kept as they
+        # are. Raw IDs of 32 hex characters (uuid4().hex, MD5-style keys) are common, so for the
+        # 128-bit algorithms nothing is passed through by its shape: only IDs already in
+        # hash_table count as hashed
+        hash_length = 2 * self._hasher(b'').digest_size
+        self._passthrough_length = hash_length if hash_length >= 64 else None
         self.hash_table: Dict[str, str] = {}
         self.not_hashed_ids: Set[str] = set()  # Track IDs that weren't hashed
         self.processed_files: Set[Path] = set()  # Track processed files
+        self._mapping_table_cache: Dict[tuple, pd.DataFrame] = {}
+        self._resolver_cache = None  # MappingResolver of the latest table read by _read_mapping_table
         self.is_running: bool = False
         self.progress_callback = progress_callback
         self.status_callback = status_callback
-        self._load_existing_lookup_table()
+        self.replace_lookup_table = replace_lookup_table
+        if load_lookup_table:
+            self._load_existing_lookup_table()
         
     def _send_status(self, message: str) -> None:
         """Send a status message to the GUI."""
@@ -32,17 +296,36 @@ class IDProcessor:
     def _load_existing_lookup_table(self) -> None:
         """Load existing lookup table if it exists."""
         lookup_path = Path('id_lookup_table.csv')
+        other_algo = None
         if lookup_path.exists():
             try:
-                lookup_df = pd.read_csv(lookup_path)
-                # Create bidirectional mapping
-                for _, row in lookup_df.iterrows():
-                    original_id = str(row['original_id'])
-                    hashed_id = str(row['hashed_id'])
-                    self.hash_table[original_id] = hashed_id
-                self._send_status(f"Loaded {len(lookup_df)} existing ID mappings from lookup table")
+                lookup_df = self.read_file(lookup_path, string_cols=['original_id', 'hashed_id', 'hash_algo'],
+                                           usecols=['original_id', 'hashed_id', 'hash_algo'])
+                # Tables written before the hash_algo column existed always used SHA-256
+                table_algos = set(lookup_df['hash_algo'].dropna().unique()) if 'hash_algo' in lookup_df else set()
+                table_algo = table_algos.pop() if len(table_algos) == 1 else ('sha256' if not table_algos else None)
+                if table_algo != self.hash_algo:
+                    # Reusing hashes from another algorithm would give the same entity two different hashes
+                    other_algo = table_algo or 'mixed algorithms'
+                else:
+                    original_ids = lookup_df['original_id']
+                    hashed_ids = lookup_df['hashed_id']
+                    # Rows without consent store the original ID as their "hash"; loading them would
+                    # make hash_id return the raw ID if consent is granted later, so they are skipped
+                    keep = original_ids.notna() & hashed_ids.notna() & (original_ids != hashed_ids)
+                    self.hash_table.update(zip(original_ids[keep].tolist(), hashed_ids[keep].tolist()))
+                    self._send_status(f"Loaded {int(keep.sum())} existing ID mappings from lookup table")
             except Exception as e:
                 self._send_status(f"Warning: Could not load existing lookup table: {str(e)}")
+        
+        # The table is written back at the end of every run, so a table of another algorithm
+        # would be overwritten and its pseudonyms lost
+        if other_algo is not None:
+            if not self.replace_lookup_table:
+                raise ValueError(f"Existing lookup table {lookup_path} was created with {other_algo}, not {self.hash_algo}. "
+                                 f"It would be overwritten at the end of the run; move it aside or use "
+                                 f"--replace-lookup-table to replace it")
+            self._send_status(f"Warning: Existing lookup table was not created with {self.hash_algo}; not loading it, it will be replaced")
 
     def stop(self) -> None:
         """Stop the processing."""
@@ -50,39 +333,206 @@ class IDProcessor:
         print("Processing will stop after current file completes...")
 
     def hash_id(self, id_value: str) -> str:
-        """Hash an ID using SHA-256."""
-        if not isinstance(id_value, str):
+        """Hash an ID using self.hash_algo (SHA-256 by default)."""
+        # If the ID is already in our hash table (either as original or hashed), return the hashed value.
+        # A single get() probes the dict once instead of an `in` check followed by an index, and
+        # it runs before any type check, so a cache hit on a string ID does no other work.
+        hashed_value = self.hash_table.get(id_value)
+        if hashed_value is not None:
+            return hashed_value
+        
+        # Table keys are strings, so other types are converted and looked up again
+        if type(id_value) is not str:
             id_value = str(id_value)
+            hashed_value = self.hash_table.get(id_value)
+            if hashed_value is not None:
+                return hashed_value
             
-        # If the ID is already in our hash table (either as original or hashed), return the hashed value
-        if id_value in self.hash_table:
-            return self.hash_table[id_value]
-            
-        # Check if the input looks like a SHA-256 hash (64 hex characters)
-        if len(id_value) == 64 and all(c in '0123456789abcdef' for c in id_value.lower()):
+        # Check if the input already looks like a hash of the configured algorithm
+        if self._passthrough_length and _looks_like_hash(id_value, self._passthrough_length):
             self.hash_table[id_value] = id_value
             return id_value
             
         # If not found and not a hash, create new hash
-        hashed_value = hashlib.sha256(id_value.encode()).hexdigest()
+        hashed_value = self._hasher(id_value.encode()).hexdigest()
         self.hash_table[id_value] = hashed_value
         return hashed_value
 
-    def read_file(self, file_path: Path) -> pd.DataFrame:
-        """Read CSV or Excel file."""
+    def _bulk_hash(self, values: Iterable[str]) -> None:
+        """Hash all values missing from the hash table, computing each unique value once."""
+        to_hash = []
+        for id_value in set(map(str, values)).difference(self.hash_table):
+            if self._passthrough_length and _looks_like_hash(id_value, self._passthrough_length):
+                self.hash_table[id_value] = id_value
+            else:
+                to_hash.append(id_value)
+        if not to_hash:
+            return
+        
+        # One list comprehension with the hasher and str.encode bound locally, so each ID costs
+        # only the hash call itself; this beats collecting raw digests and hex-encoding them at once
+        hasher = self._hasher
+        encode = str.encode
+        self.hash_table.update(zip(to_hash, [hasher(encode(id_value)).hexdigest() for id_value in to_hash]))
+
+    def read_file(self, file_path: Path, string_cols: Iterable[str] = (), usecols: Iterable[str] = None) -> pd.DataFrame:
+        """Read CSV or Excel file, keeping the columns in string_cols as text and only loading usecols."""
+        # ID columns are read as strings so values like '007' keep their leading zeros and
+        # never need a str() conversion later; names missing from the file are ignored
+        dtype = {col: str for col in string_cols}
+        wanted = set(usecols) if usecols is not None else None
         try:
             suffix = file_path.suffix.lower()
             if suffix == '.csv':
-                return pd.read_csv(file_path)
-            elif suffix == '.xlsx':
-                return pd.read_excel(file_path, engine='openpyxl')
-            elif suffix == '.xls':
-                return pd.read_excel(file_path, engine='xlrd')
+                if wanted is not None:
+                    # Only the header is parsed here, to resolve which wanted columns exist
+                    usecols = [col for col in pd.read_csv(file_path, nrows=0).columns if col in wanted]
+                if pa is not None:
+                    if dtype or usecols is not None:
+                        # pandas' pyarrow engine only applies dtype after type inference, which has
+                        # already turned '007' into 7, so the column types go straight to Arrow
+                        convert_options = pacsv.ConvertOptions(
+                            column_types={col: pa.string() for col in dtype},
+                            strings_can_be_null=True,
+                            include_columns=usecols,
+                        )
+                        table = pacsv.read_csv(str(file_path), convert_options=convert_options)
+                        return table.to_pandas(types_mapper=pd.ArrowDtype)
+                    # Multi-threaded Arrow parser
+                    return pd.read_csv(file_path, engine='pyarrow', dtype_backend='pyarrow')
+                return pd.read_csv(file_path, dtype=dtype or None, usecols=usecols)
+            elif suffix in ('.xlsx', '.xls'):
+                engine = _XLSX_READ_ENGINE if suffix == '.xlsx' else 'xlrd'
+                usecols = (lambda col: col in wanted) if wanted is not None else None
+                return pd.read_excel(file_path, engine=engine, dtype=dtype or None, usecols=usecols)
             else:
                 raise ValueError(f"Unsupported file format: {suffix}")
         except Exception as e:
             raise ValueError(f"Failed to read file {file_path}: {str(e)}")
 
+    def _iter_csv_chunks(self, file_path: Path, string_cols: Iterable[str] = ()) -> Iterator[pd.DataFrame]:
+        """Read a CSV file lazily in chunks, keeping string_cols as text."""
+        try:
+            # Yield at least one (possibly empty) frame so callers can inspect the header
+            if pacsv is not None:
+                yield from self._iter_csv_batches(file_path)
+            else:
+                dtype = {col: str for col in string_cols}
+                yield from pd.read_csv(file_path, chunksize=self.CSV_CHUNK_SIZE, dtype=dtype or None)
+        except Exception as e:
+            raise ValueError(f"Failed to read file {file_path}: {str(e)}")
+
+    def _iter_csv_batches(self, file_path: Path) -> Iterator[pd.DataFrame]:
+        """Stream a CSV file with Arrow's reader in batches of CSV_BLOCK_SIZE bytes, every column as text."""
+        # Every column is read as a string: the rows are only passed through, so values are
+        # written back exactly as they were (no '1.50' -> '1.5'), and a type inferred from the
+        # first batch can never conflict with a later one. Only empty cells count as missing.
+        columns = pd.read_csv(file_path, nrows=0).columns
+        reader = pacsv.open_csv(
+            str(file_path),
+            read_options=pacsv.ReadOptions(block_size=self.CSV_BLOCK_SIZE),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={col: pa.string() for col in columns},
+                strings_can_be_null=True,
+                null_values=[''],
+            ),
+        )
+        empty = True
+        for batch in reader:
+            empty = False
+            yield batch.to_pandas()
+        if empty:
+            yield reader.schema.empty_table().to_pandas()
+
+    def _csv_table(self, df: pd.DataFrame):
+        """Return df as an Arrow table that Arrow's CSV writer renders exactly as pandas' to_csv would, or None."""
+        if _ARROW_CSV_EOL is None:
+            return None
+        table = self._to_arrow(df)
+        if table is None:
+            return None
+        # Cells pandas would quote: the delimiter, quotes or line breaks, and an empty string
+        # that is a whole row
+        needs_quotes = r'[",\r\n]' if table.num_columns > 1 else r'(^$)|[",\r\n]'
+        for i, field in enumerate(table.schema):
+            column = table.column(i)
+            if pa.types.is_boolean(field.type):
+                # pandas writes True/False, Arrow true/false
+                table = table.set_column(i, field.name, pc.if_else(column, 'True', 'False'))
+            elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                if pc.any(pc.match_substring_regex(column, needs_quotes)).as_py():
+                    return None
+            elif not (pa.types.is_integer(field.type) or pa.types.is_null(field.type)):
+                # Floats, dates and other types are formatted differently by the two writers
+                return None
+        return table
+
+    def _write_csv(self, df: pd.DataFrame, target: Union[Path, BinaryIO], header: bool = True) -> None:
+        """Write a DataFrame to a CSV path or binary handle in pandas' format.
+        
+        Arrow's writer is used for the rows when its output is byte-for-byte what to_csv would
+        write: text, integer and boolean columns with no cell that needs quoting. Anything else
+        goes through pandas, so files written back to the user always keep pandas' minimal quoting.
+        """
+        table = self._csv_table(df)
+        if table is not None:
+            out = open(target, 'wb') if isinstance(target, Path) else target
+            try:
+                # The header line comes from pandas, which quotes column names only when needed;
+                # an unquoted Arrow header needs pyarrow 22. Nothing in the rows needs quoting,
+                # so they are written bare, as pandas does.
+                if header:
+                    out.write(df.head(0).to_csv(index=False).encode('utf-8'))
+                write_options = pacsv.WriteOptions(include_header=False, batch_size=65536, quoting_style='none',
+                                                   **_ARROW_CSV_EOL)
+                pacsv.write_csv(table, out, write_options=write_options)
+            finally:
+                if out is not target:
+                    out.close()
+        else:
+            # Format a bounded number of rows at a time rather than the whole frame
+            df.to_csv(target, index=False, header=header, chunksize=self.CSV_CHUNK_SIZE)
+
+    def _write_xlsx(self, df: pd.DataFrame, target: Path) -> None:
+        """Write a DataFrame to an .xlsx file, using xlsxwriter when available."""
+        if _XLSX_WRITE_ENGINE == 'xlsxwriter':
+            # xlsxwriter's constant_memory mode is not used: pandas emits cells column by
+            # column, and constant_memory silently drops cells that arrive out of row order
+            with pd.ExcelWriter(str(target), engine=_XLSX_WRITE_ENGINE) as writer:
+                df.to_excel(writer, index=False)
+            return
+        
+        # Without xlsxwriter, stream rows through openpyxl's write-only mode instead of
+        # building the whole sheet in memory as pandas' openpyxl writer does
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Sheet1')
+        sheet.append([str(col) for col in df.columns])
+        for start in range(0, len(df), self.CSV_CHUNK_SIZE):
+            rows = df.iloc[start:start + self.CSV_CHUNK_SIZE].astype(object)
+            # Missing values become empty cells, as with to_excel
+            for row in rows.where(rows.notna(), None).itertuples(index=False, name=None):
+                sheet.append(row)
+        workbook.save(str(target))
+
+    def _to_arrow(self, df: pd.DataFrame):
+        """Convert a DataFrame to an Arrow table, or return None if pyarrow is missing or cannot represent it."""
+        if pa is None:
+            return None
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # e.g. object columns mixing numbers and strings
+            return None
+
+    def _write_lookup_table(self, lookup_df: pd.DataFrame, lookup_path: Path) -> None:
+        """Write the lookup table as CSV, plus a snappy-compressed Parquet copy when pyarrow is available."""
+        self._write_csv(lookup_df, lookup_path)
+        table = self._to_arrow(lookup_df)
+        if table is not None:
+            pq.write_table(table, str(lookup_path.with_suffix('.parquet')), compression='snappy')
+
     def find_files(self, mapping_df: pd.DataFrame) -> List[Path]:
         """Find all files mentioned in the mapping file."""
         files = set()
@@ -112,10 +562,10 @@ class IDProcessor:
         
         return list(files)
 
-    def create_id_mapping(self, mapping_file_path: Path, mapping_df: pd.DataFrame, source_context: str = None) -> tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    def create_id_mapping(self, mapping_file_path: Path, mapping_df: pd.DataFrame, source_context: str = None, mapping_table: pd.DataFrame = None) -> tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
         """Create a mapping of original IDs to hashed IDs based on relationships in mapping file."""
-        # Read the mapping table
-        mapping_table = self.read_file(mapping_file_path)
+        if mapping_table is None:
+            mapping_table = self._read_mapping_table(mapping_file_path, mapping_df)
         
         # Validate the new structure or handle legacy format
         if 'person_id' in mapping_table.columns:
@@ -127,47 +577,114 @@ class IDProcessor:
             self._send_status("Using legacy mapping structure. Consider upgrading to new format.")
             return self._create_legacy_mapping(mapping_table, mapping_df)
 
+    def _build_id_mappings(self, mapping_file_path: Path, mapping_df: pd.DataFrame, contexts: List[str]) -> tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+        """Create the mappings for a run: the base mapping merged with one per source context.
+        
+        The result is cached in <mapping table>.idmap.json and reused by later runs while the
+        mapping table, its ID columns, the contexts and the hash algorithm are unchanged.
+        """
+        stat = mapping_file_path.stat()
+        cache_key = [self.ID_MAPPING_CACHE_VERSION, stat.st_mtime_ns, stat.st_size,
+                     [str(col) for col in mapping_df['mapping_id'].dropna().unique()],
+                     [str(context) for context in contexts], self.hash_algo]
+        # Anyone who can write to the data folder can write this file, so it is plain JSON that
+        # is only ever read as data, and every entry is checked to be text
+        cache_path = mapping_file_path.with_name(mapping_file_path.name + '.idmap.json')
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached['key'] == cache_key:
+                mappings = tuple(_decode_mapping(pairs) for pairs in cached['mappings'])
+                if len(mappings) != 3:
+                    raise ValueError("expected 3 mappings")
+                self._send_status(f"Reusing ID mappings cached in {cache_path}")
+                return mappings
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self._send_status(f"Warning: Could not read ID mapping cache {cache_path}: {str(e)}")
+        
+        # Don't extract source_context from mapping_df - we use the individual file contexts.
+        # The mapping table is read once and shared by every per-context mapping.
+        mapping_table = self._read_mapping_table(mapping_file_path, mapping_df)
+        id_mapping, consent_status_mapping, person_mapping = self.create_id_mapping(mapping_file_path, mapping_df, None, mapping_table)
+        for context in contexts:
+            # Create a new mapping for this specific file context and merge it
+            file_id_mapping, file_consent_mapping, _ = self.create_id_mapping(mapping_file_path, mapping_df, context, mapping_table)
+            id_mapping.update(file_id_mapping)
+            consent_status_mapping.update(file_consent_mapping)
+        mappings = (id_mapping, consent_status_mapping, person_mapping)
+        
+        try:
+            _write_json(cache_path, {'key': cache_key, 'mappings': [_encode_mapping(mapping) for mapping in mappings]})
+        except (OSError, TypeError, ValueError) as e:
+            self._send_status(f"Warning: Could not write ID mapping cache {cache_path}: {str(e)}")
+        return mappings
+
+    def _read_mapping_table(self, mapping_file_path: Path, mapping_df: pd.DataFrame) -> pd.DataFrame:
+        """Read a mapping table, reusing the parsed frame while the file is unchanged."""
+        # Read the mapping table, with every column that can hold an ID kept as text. Only the
+        # columns either structure uses are loaded; notes and other extra columns are skipped.
+        id_columns = ['person_id', 'id_value', *mapping_df['mapping_id'].dropna().unique()]
+        
+        # create_id_mapping runs once per source context, so the same table is requested
+        # repeatedly; the modification time in the key makes edits to the file take effect
+        stat = mapping_file_path.stat()
+        cache_key = (mapping_file_path.resolve(), stat.st_mtime_ns, stat.st_size, tuple(id_columns))
+        mapping_table = self._mapping_table_cache.get(cache_key)
+        if mapping_table is None:
+            # effective_date is kept for resolve_id_conflicts
+            mapping_table = self.read_file(mapping_file_path, string_cols=id_columns,
+                                           usecols=[*self.MAPPING_TABLE_COLUMNS, 'effective_date', *id_columns])
+            # Low-cardinality text columns are dictionary-encoded: each distinct value is stored
+            # once, and isin and == comparisons work on the small category arrays
+            for col in ('id_type', 'source_context', 'consent_status'):
+                if col in mapping_table.columns and col not in id_columns:
+                    mapping_table[col] = mapping_table[col].astype('category')
+            self._mapping_table_cache = {cache_key: mapping_table}  # Only the latest table is kept
+        return mapping_table
+
     def _create_person_centric_mapping(self, mapping_table: pd.DataFrame, source_context: str = None) -> tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
         """Create mappings using the new person-centric structure."""
         id_mapping = {}
         consent_status_mapping = {}
         person_mapping = {}  # Maps person_id to hashed_id
         
-        # Group by person_id to ensure consistent hashing per person
-        for person_id, person_records in mapping_table.groupby('person_id'):
-            consent_status = person_records.iloc[0]['consent_status'].lower()
+        # Build the key of every record once from the columns: an (id_value, id_type) tuple, plus
+        # the source_context only if it's provided and not empty. Tuples keep the parts apart, so
+        # values containing '_' can't be confused with one another.
+        context_parts = _context_parts(source_context)
+        record_keys = pd.Index([(str(id_value), str(id_type), *context_parts) for id_value, id_type
+                                in zip(mapping_table['id_value'].tolist(), mapping_table['id_type'].tolist())],
+                               dtype=object, tupleize_cols=False)
+        
+        # Group by person_id to ensure consistent hashing per person. Only the row positions of
+        # each group are needed, so no per-person frame or row Series is built; the consent
+        # status comes straight from the column array at the first record's position.
+        consent_column = mapping_table['consent_status'].to_numpy(dtype=object)
+        groups = []
+        for person_id, person_positions in mapping_table.groupby('person_id').indices.items():
+            consent_status = consent_column[person_positions[0]].lower()
             
-            if consent_status not in ['granted', 'revoked', 'none', 'id not found']:
+            if consent_status not in self.CONSENT_STATUSES:
                 consent_status = 'none'
-            
+            groups.append((person_id, record_keys[person_positions], consent_status))
+        
+        # Hash every person with granted consent in one pass
+        self._bulk_hash(person_id for person_id, _, consent_status in groups if consent_status == 'granted')
+        
+        for person_id, person_keys, consent_status in groups:
             # Only hash IDs if consent is granted
             if consent_status == 'granted':
                 # Use person_id as the base for hashing to ensure consistency
-                hashed_id = self.hash_id(person_id)
+                hashed_id = self.hash_table[str(person_id)]
                 person_mapping[person_id] = hashed_id
                 
                 # Map all IDs for this person to the same hash
-                for _, record in person_records.iterrows():
-                    # Create key based on id_value and id_type
-                    id_key = f"{record['id_value']}_{record['id_type']}"
-                    
-                    # Only add source_context to key if it's provided and not empty
-                    if source_context and str(source_context).strip() and str(source_context).lower() != 'nan':
-                        id_key += f"_{source_context}"
-                    
-                    id_mapping[id_key] = hashed_id
-                    consent_status_mapping[id_key] = consent_status
-            else:
-                # Store consent status for all IDs belonging to this person
-                for _, record in person_records.iterrows():
-                    # Create key based on id_value and id_type
-                    id_key = f"{record['id_value']}_{record['id_type']}"
-                    
-                    # Only add source_context to key if it's provided and not empty
-                    if source_context and str(source_context).strip() and str(source_context).lower() != 'nan':
-                        id_key += f"_{source_context}"
-                    
-                    consent_status_mapping[id_key] = consent_status
+                id_mapping.update(dict.fromkeys(person_keys, hashed_id))
+            
+            # Store consent status for all IDs belonging to this person
+            consent_status_mapping.update(dict.fromkeys(person_keys, consent_status))
         
         return id_mapping, consent_status_mapping, person_mapping
 
@@ -177,33 +694,67 @@ class IDProcessor:
         consent_status_mapping = {}
         person_mapping = {}
         
+        # The distinct mapping_id names are computed once and checked against a plain set of
+        # column names; blank mapping_id cells (NaN) are not column names and are dropped up front
+        table_columns = set(mapping_table.columns)
+        id_columns = [col for col in mapping_df['mapping_id'].dropna().unique() if col in table_columns]
+        
+        # Pull the ID columns out once as a NumPy block instead of building a Series per row
+        id_block = mapping_table[id_columns].to_numpy(dtype=object)
+        
+        # Get consent status for every row at once, defaulting to "none" if missing or unrecognised
+        if 'consent_status' in mapping_table.columns:
+            consent_values = mapping_table['consent_status'].astype(str).str.lower().to_numpy(dtype=object)
+            consent_values = np.where(np.isin(consent_values, self.CONSENT_STATUSES), consent_values, 'none')
+        else:
+            consent_values = np.full(len(mapping_table), 'none', dtype=object)
+        
+        # Missing cells are found with one vectorized isna over the whole block
+        valid = ~pd.isna(id_block)
+        
         # First, establish relationships from the mapping table
-        for _, row in mapping_table.iterrows():
-            ids_in_row = []
-            for col in mapping_df['mapping_id'].unique():
-                if col in row and pd.notna(row[col]):
-                    ids_in_row.append(str(row[col]))
-            
-            # Get consent status for this row, default to "none" if not present
-            consent_status = str(row.get('consent_status', 'none')).lower()
-            if consent_status not in ['granted', 'revoked', 'none', 'id not found']:
-                consent_status = 'none'
+        rows = []
+        for row_values, row_valid, consent_status in zip(id_block, valid, consent_values.tolist()):
+            ids_in_row = [str(val) for val in row_values[row_valid]]
             
             # If we found related IDs, process them based on consent status
             if ids_in_row:
-                # Only hash IDs if consent is granted
-                if consent_status == 'granted':
-                    hashed_id = self.hash_id(ids_in_row[0])
-                    for id_val in ids_in_row:
-                        id_mapping[id_val] = hashed_id
-                # Store consent status for all IDs in the row
+                rows.append((ids_in_row, consent_status))
+        
+        # IDs are equivalent transitively: if A and B share a row and B and C share another,
+        # A, B and C are one entity. Each connected component is represented by its
+        # first-seen ID, which is a row's first ID whenever the component fits in one row.
+        # IDs are numbered in first-seen order, so that is the smallest number in the component,
+        # and IDs next to each other in a row are joined by an edge.
+        row_lengths = [len(ids_in_row) for ids_in_row, _ in rows]
+        id_codes, unique_ids = pd.factorize(np.array(list(itertools.chain.from_iterable(ids_in_row for ids_in_row, _ in rows)), dtype=object))
+        row_of = np.repeat(np.arange(len(rows)), row_lengths)
+        same_row = row_of[:-1] == row_of[1:]
+        roots = _component_roots(id_codes[:-1][same_row], id_codes[1:][same_row], len(unique_ids))
+        unique_ids = np.asarray(unique_ids, dtype=object)
+        representative = dict(zip(unique_ids.tolist(), unique_ids[roots].tolist()))
+        
+        # Hash the representative of every granted row in one pass
+        self._bulk_hash(representative[ids_in_row[0]] for ids_in_row, consent_status in rows if consent_status == 'granted')
+        
+        for ids_in_row, consent_status in rows:
+            # Only hash IDs if consent is granted
+            if consent_status == 'granted':
+                hashed_id = self.hash_table[representative[ids_in_row[0]]]
                 for id_val in ids_in_row:
-                    consent_status_mapping[id_val] = consent_status
+                    id_mapping[id_val] = hashed_id
+            # Store consent status for all IDs in the row
+            for id_val in ids_in_row:
+                consent_status_mapping[id_val] = consent_status
         
         return id_mapping, consent_status_mapping, person_mapping
 
-    def update_file_ids(self, file_path: Path, id_column: str, id_mapping: Dict[str, str], consent_status_mapping: Dict[str, str], id_type: str = None, source_context: str = None) -> None:
-        """Update IDs in a file using the provided ID mapping and create training table."""
+    def update_file_ids(self, file_path: Path, id_column: str, id_mapping: Dict[str, str], consent_status_mapping: Dict[str, str], id_type: str = None, source_context: str = None, id_lookup: pd.DataFrame = None) -> None:
+        """Update IDs in a file using the provided ID mapping and create training table.
+        
+        id_lookup is the combined table from _build_id_lookup; pass it when processing several
+        files with the same mappings so it is only built once.
+        """
         if not self.is_running:
             self._send_status(f"Skipping {file_path} as processing was stopped")
             return
@@ -213,112 +764,130 @@ class IDProcessor:
             self._send_status(f"Skipping {file_path} - already processed")
             return
 
+        # The original becomes the backup by renaming, so an existing backup would be replaced and
+        # the only untouched copy lost; it also means this file was most likely processed already
+        backup_path = file_path.with_suffix(file_path.suffix + '.backup')
+        if backup_path.exists():
+            raise ValueError(f"Backup {backup_path} already exists, so {file_path} may have been processed already; "
+                             f"move the backup aside to process the file again")
+
         self._send_status(f"Processing file: {file_path}")
-        df = self.read_file(file_path)
+        suffix = file_path.suffix.lower()
+        if suffix == '.csv':
+            # Stream CSVs chunk by chunk so peak memory is bounded by the chunk size
+            chunks = self._iter_csv_chunks(file_path, string_cols=[id_column])
+        else:
+            chunks = iter([self.read_file(file_path, string_cols=[id_column])])
         
-        if id_column not in df.columns:
+        first_chunk = next(chunks)
+        if id_column not in first_chunk.columns:
             raise ValueError(f"Column {id_column} not found in {file_path}")
         
-        # Count how many IDs will be updated
-        original_ids = df[id_column].astype(str).unique()
-        self._send_status(f"Found {len(original_ids)} unique IDs to process in {file_path}")
-        
-        # Helper function to create lookup key
-        def create_lookup_key(id_val, id_type, source_context):
-            key = f"{id_val}_{id_type}" if id_type else str(id_val)
-            if source_context and str(source_context).strip() and str(source_context).lower() != 'nan':
-                key += f"_{source_context}"
-            return key
-        
-        # Add consent_status column to original table
-        if id_type and source_context:
-            # New structure - use enhanced lookup
-            df['consent_status'] = df[id_column].astype(str).map(
-                lambda x: consent_status_mapping.get(create_lookup_key(x, id_type, source_context), 'ID not found')
-            )
-        else:
-            # Legacy structure
-            df['consent_status'] = df[id_column].astype(str).map(lambda x: consent_status_mapping.get(x, 'ID not found'))
-        
-        # Track IDs that aren't being hashed
-        for id_val in original_ids:
-            lookup_key = create_lookup_key(id_val, id_type, source_context) if id_type else str(id_val)
-            if lookup_key not in id_mapping:
-                self.not_hashed_ids.add(str(id_val))
-        
-        # Create training table with only granted consent records and hashed IDs
-        training_df = df[df['consent_status'] == 'granted'].copy()
-        # Update IDs in training table only
-        if id_type and source_context:
-            # New structure - use enhanced lookup
-            training_df[id_column] = training_df[id_column].astype(str).map(
-                lambda x: id_mapping.get(create_lookup_key(x, id_type, source_context), x)
-            )
-        else:
-            # Legacy structure
-            training_df[id_column] = training_df[id_column].astype(str).map(lambda x: id_mapping.get(x, x))
-        training_file_path = file_path.parent / f"{file_path.stem}_training{file_path.suffix}"
+        # Keys are the bare ID in the legacy structure and (id_value, id_type[, source_context])
+        # tuples otherwise. The parts after the ID are the same for the whole file, so keys can
+        # be built for all IDs of a chunk at once. Consent uses the enhanced key only when a
+        # source context is given; IDs without a hash are always tracked under the typed key.
+        key_parts = (str(id_type), *_context_parts(source_context)) if id_type else ()
+        consent_parts = key_parts if id_type and source_context else ()
         
-        # Create a temporary file in the same directory as the target file
-        temp_dir = file_path.parent
-        suffix = file_path.suffix.lower()
+        def lookup_keys(id_vals: np.ndarray, parts: tuple):
+            if not parts:
+                return id_vals
+            return pd.Index([(id_val, *parts) for id_val in id_vals.tolist()], dtype=object, tupleize_cols=False)
+        
+        # Consent and hashes come from one combined table; -1 (not found) positions select
+        # the trailing defaults appended below
+        if id_lookup is None:
+            id_lookup = _build_id_lookup(id_mapping, consent_status_mapping)
+        consent_by_pos = np.append(id_lookup['consent_status'].to_numpy(dtype=object), 'ID not found')
+        hash_by_pos = np.append(id_lookup['hashed_id'].to_numpy(dtype=object), None)
+        seen_ids = set()
+        
+        def update_chunk(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+            # The column is factorized once: every distinct value is resolved a single time, and
+            # the results are broadcast back to the rows with integer takes. Only the distinct
+            # values are converted to str, so numeric ID columns are never copied into strings.
+            codes, uniques = pd.factorize(df[id_column], use_na_sentinel=False)
+            id_vals = np.array([str(raw_val) for raw_val in uniques.tolist()], dtype=object)
+            seen_ids.update(id_vals)
+            
+            # One vectorized index probe resolves every distinct ID of the chunk
+            positions = id_lookup.index.get_indexer(lookup_keys(id_vals, consent_parts))
+            unique_consent = consent_by_pos[positions]
+            unique_hash = hash_by_pos[positions]
+            
+            # Track IDs that aren't being hashed
+            if key_parts != consent_parts:
+                unhashed = pd.isna(hash_by_pos[id_lookup.index.get_indexer(lookup_keys(id_vals, key_parts))])
+            else:
+                unhashed = pd.isna(unique_hash)
+            self.not_hashed_ids.update(id_vals[unhashed])
+            
+            # IDs without a hash keep their original value
+            unique_hash = np.where(pd.isna(unique_hash), id_vals, unique_hash)
+            
+            # Add consent_status column to original table
+            consent_values = np.array(unique_consent, dtype=object)[codes]
+            df['consent_status'] = consent_values
+            
+            # Create training table with only granted consent records and hashed IDs
+            # Boolean indexing already yields new rows, so instead of a second full .copy()
+            # only the ID column is replaced, in the training table only
+            granted = consent_values == 'granted'
+            training_df = df[granted].assign(**{id_column: np.array(unique_hash, dtype=object)[codes[granted]]})
+            return df, training_df
+        
+        training_file_path = file_path.parent / f"{file_path.stem}_training{file_path.suffix}"
         
-        # Generate a unique temporary filename
-        temp_suffix = f"_{random.randint(1000, 9999)}{suffix}"
-        temp_path = temp_dir / f"temp{temp_suffix}"
+        # Create a uniquely named temporary file in the same directory as the target file,
+        # so the final os.replace stays on one filesystem
+        fd, temp_name = tempfile.mkstemp(dir=file_path.parent, suffix=suffix, prefix='.idp_tmp_')
+        os.close(fd)
+        temp_path = Path(temp_name)
         
         try:
             self._send_status(f"Saving updated files: {file_path} and {training_file_path}")
             # First, write to the temporary file
             if suffix == '.csv':
-                df.to_csv(temp_path, index=False)
-                training_df.to_csv(training_file_path, index=False)
-            elif suffix == '.xlsx':
-                with pd.ExcelWriter(str(temp_path), engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False)
-                with pd.ExcelWriter(str(training_file_path), engine='openpyxl') as writer:
-                    training_df.to_excel(writer, index=False)
-            elif suffix == '.xls':
-                with pd.ExcelWriter(str(temp_path), engine='xlwt') as writer:
-                    df.to_excel(writer, index=False)
-                with pd.ExcelWriter(str(training_file_path), engine='xlwt') as writer:
-                    training_df.to_excel(writer, index=False)
-            
-            # Force sync to ensure file is written
-            if hasattr(os, 'sync'):
-                os.sync()
+                # The training chunk is written on a second thread while the updated chunk is
+                # written here; Arrow's CSV writer releases the GIL, so the two writes overlap
+                with open(temp_path, 'wb') as out, open(training_file_path, 'wb') as training_out, \
+                        ThreadPoolExecutor(max_workers=1) as training_writer:
+                    pending = None
+                    for i, chunk in enumerate(itertools.chain([first_chunk], chunks)):
+                        chunk, training_chunk = update_chunk(chunk)
+                        if pending is not None:
+                            pending.result()  # at most one training chunk in flight
+                        pending = training_writer.submit(self._write_csv, training_chunk, training_out, header=(i == 0))
+                        self._write_csv(chunk, out, header=(i == 0))
+                    if pending is not None:
+                        pending.result()
+            else:
+                df, training_df = update_chunk(first_chunk)
+                if suffix == '.xlsx':
+                    self._write_xlsx(df, temp_path)
+                    self._write_xlsx(training_df, training_file_path)
+                elif suffix == '.xls':
+                    with pd.ExcelWriter(str(temp_path), engine='xlwt') as writer:
+                        df.to_excel(writer, index=False)
+                    with pd.ExcelWriter(str(training_file_path), engine='xlwt') as writer:
+                        training_df.to_excel(writer, index=False)
+            self._send_status(f"Processed {len(seen_ids)} unique IDs in {file_path}")
             
-            # Give some time for the file system to finish writing
-            time.sleep(1)
+            # Make sure the new file is on disk before it takes the original's place, so a crash
+            # can't leave a truncated file under the original name. Only this file is synced.
+            _fsync_file(temp_path)
+            # mkstemp creates owner-only files; give the new file the original's permissions
+            shutil.copymode(file_path, temp_path)
             
-            # Now try to replace the original file
-            max_attempts = 3
-            for attempt in range(max_attempts):
-                try:
-                    # First, try to remove the original file if it exists
-                    if file_path.exists():
-                        os.remove(file_path)
-                        time.sleep(0.5)  # Wait a bit after deletion
-                    
-                    # Now try to rename the temp file
-                    os.rename(temp_path, file_path)
-                    self._send_status(f"Successfully updated {file_path} and created {training_file_path}")
-                    self.processed_files.add(file_path)  # Mark file as processed
-                    break
-                except Exception as e:
-                    if attempt == max_attempts - 1:  # Last attempt
-                        raise
-                    self._send_status(f"Attempt {attempt + 1} failed, retrying...")
-                    time.sleep(2)  # Wait before retry
-                    gc.collect()  # Force garbage collection
-                
+            # Now replace the original file. The original is renamed to the backup rather
+            # than copied, and os.replace overwrites atomically, so no delete-and-retry is needed.
+            os.replace(file_path, backup_path)
+            os.replace(temp_path, file_path)
+            self._send_status(f"Successfully updated {file_path} (original kept as {backup_path}) and created {training_file_path}")
+            self.processed_files.add(file_path)  # Mark file as processed
+
         except Exception as e:
-            # Clean up temporary file if it exists
-            if temp_path.exists():
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
             raise Exception(f"Failed to update file {file_path}: {str(e)}")
         finally:
             # Final cleanup
@@ -327,122 +896,166 @@ class IDProcessor:
                     os.remove(temp_path)
                 except:
                     pass
-            gc.collect()
 
     def create_lookup_table(self, id_mapping: Dict[str, str], consent_status_mapping: Dict[str, str], person_mapping: Dict[str, str] = None) -> pd.DataFrame:
         """Create a lookup table of original IDs and their hashed values."""
-        records = []
-        processed_ids = set()
+        frames = []
         
         # Add person mappings if available (new structure)
+        seen_ids = set()
         if person_mapping:
-            for person_id, hashed_id in person_mapping.items():
-                records.append({
-                    'person_id': person_id,
-                    'original_id': person_id,
-                    'hashed_id': hashed_id,
-                    'consent_status': 'granted',
-                    'from_mapping': True
-                })
-                processed_ids.add(person_id)
-        
-        # First add all IDs from the mapping that have granted consent
-        for original_id, hashed_id in id_mapping.items():
-            if consent_status_mapping.get(original_id) == 'granted':
-                # Parse ID key to extract components if it's in new format
-                id_parts = original_id.split('_')
-                
-                # Handle different key formats:
-                # Format 1: "id_value_id_type" (2 parts)
-                # Format 2: "id_value_id_type_source_context" (3 parts)
-                if len(id_parts) >= 2:
-                    actual_id = id_parts[0]
-                    id_type = id_parts[1]
-                    source_context = id_parts[2] if len(id_parts) > 2 else None
-                else:
-                    # Fallback for legacy format
-                    actual_id = original_id
-                    id_type = None
-                    source_context = None
-                
-                record = {
-                    'person_id': '',  # Will be filled if we can match to person_mapping
-                    'original_id': actual_id,
-                    'hashed_id': hashed_id,
-                    'consent_status': 'granted',
-                    'from_mapping': True
-                }
-                
-                if id_type:
-                    record['id_type'] = id_type
-                if source_context:
-                    record['source_context'] = source_context
-                    
-                records.append(record)
-                processed_ids.add(actual_id)
-        
-        # Then add any additional IDs that were hashed and have granted consent
-        for original_id, hashed_id in self.hash_table.items():
-            if original_id not in processed_ids and consent_status_mapping.get(original_id) == 'granted':
-                records.append({
-                    'person_id': '',
-                    'original_id': original_id,
-                    'hashed_id': hashed_id,
-                    'consent_status': 'granted'
-                })
-                processed_ids.add(original_id)
-        
-        # Add all remaining IDs from consent_status_mapping that weren't processed
-        for original_id, status in consent_status_mapping.items():
-            if original_id not in processed_ids:
-                # Parse ID key to extract components
-                id_parts = original_id.split('_')
-                
-                if len(id_parts) >= 2:
-                    actual_id = id_parts[0]
-                    id_type = id_parts[1]
-                    source_context = id_parts[2] if len(id_parts) > 2 else None
-                else:
-                    actual_id = original_id
-                    id_type = None
-                    source_context = None
-                
-                record = {
-                    'person_id': '',
-                    'original_id': actual_id,
-                    'hashed_id': actual_id,  # Use original ID as no hashing was done
-                    'consent_status': status
-                }
-                
-                if id_type:
-                    record['id_type'] = id_type
-                if source_context:
-                    record['source_context'] = source_context
-                    
-                records.append(record)
-                processed_ids.add(actual_id)
+            person_ids = [str(person_id) for person_id in person_mapping]
+            frames.append(pd.DataFrame({
+                'person_id': person_ids,
+                'original_id': person_ids,
+                'hashed_id': list(person_mapping.values()),
+                'consent_status': 'granted',
+                'from_mapping': True,
+            }))
+            seen_ids.update(person_ids)
+        
+        # One row per mapping key. Keys are (id_value, id_type) or
+        # (id_value, id_type, source_context) tuples in the new structure, and the bare ID
+        # in the legacy one.
+        # Every key is padded to its three parts in a single pass and the columns are sliced out
+        # of that block; hashes and statuses are filled by fromiter straight from the dicts.
+        key_list = list(consent_status_mapping)
+        key_count = len(key_list)
+        keys = pd.Series(key_list, dtype=object)
+        id_parts = np.array([key + (None,) * (3 - len(key)) if type(key) is tuple else (key, None, None)
+                             for key in key_list], dtype=object).reshape(-1, 3)
+        statuses = pd.Series(np.fromiter(consent_status_mapping.values(), dtype=object, count=key_count))
+        hashed_ids = pd.Series(np.fromiter(map(id_mapping.get, key_list), dtype=object, count=key_count))
+        granted = (statuses == 'granted') & hashed_ids.notna()
+        actual_ids = pd.Series(id_parts[:, 0])
+        mapping_rows = pd.DataFrame({
+            'person_id': '',  # only known for person_mapping rows
+            'original_id': actual_ids,
+            # IDs without granted consent were not hashed, so the original ID is kept
+            'hashed_id': hashed_ids.where(granted, actual_ids),
+            'consent_status': statuses,
+            'from_mapping': pd.Series(np.where(granted, True, None), dtype=object),
+            'id_type': id_parts[:, 1],
+            'source_context': id_parts[:, 2],
+        })
+        # Granted IDs come first, as they did when each group was collected in its own loop
+        frames.append(mapping_rows[granted])
+        seen_ids.update(actual_ids[granted])
+        
+        # Then add any additional IDs that were hashed and have granted consent. The candidates
+        # come from set operations on the key views instead of a walk over the whole hash table.
+        granted_keys = set(keys[statuses == 'granted'].tolist())
+        extra_ids = sorted((self.hash_table.keys() & granted_keys) - seen_ids)
+        if extra_ids:
+            extra_hashes = [self.hash_table[original_id] for original_id in extra_ids]
+            frames.append(pd.DataFrame({'person_id': '', 'original_id': extra_ids, 'hashed_id': extra_hashes, 'consent_status': 'granted'}))
+            seen_ids.update(extra_ids)
+        
+        # Add all remaining IDs from consent_status_mapping that weren't already written
+        remaining = ~granted & ~keys.isin(seen_ids)
+        frames.append(mapping_rows[remaining])
+        seen_ids.update(actual_ids[remaining])
         
         # Add all non-hashed IDs that we found in the data tables
-        for original_id in self.not_hashed_ids:
-            if original_id not in processed_ids:
-                records.append({
-                    'person_id': '',
-                    'original_id': original_id,
-                    'hashed_id': original_id,  # Use original ID as no hashing was done
-                    'consent_status': 'ID not found',
-                })
+        not_found_ids = sorted(self.not_hashed_ids - seen_ids)
+        if not_found_ids:
+            frames.append(pd.DataFrame({'person_id': '', 'original_id': not_found_ids, 'hashed_id': not_found_ids, 'consent_status': 'ID not found'}))
         
-        return pd.DataFrame(records)
+        lookup_df = pd.concat(frames, ignore_index=True).reindex(columns=self.LOOKUP_COLUMNS)
+        # Recorded so a later run only reuses these hashes with the same algorithm
+        lookup_df['hash_algo'] = self.hash_algo
+        # Optional columns are only written when at least one row uses them
+        optional_columns = [col for col in ('from_mapping', 'id_type', 'source_context') if lookup_df[col].isna().all()]
+        return lookup_df.drop(columns=optional_columns)
 
     def create_backup(self, file_path: Path) -> Path:
-        """Create a backup of a file before modifying it."""
+        """Create a backup of a file before modifying it.
+        
+        Kept only as public API: processing makes backups by renaming the original in
+        update_file_ids and doesn't call this.
+        """
         backup_path = file_path.with_suffix(file_path.suffix + '.backup')
-        import shutil
         shutil.copy2(file_path, backup_path)
         return backup_path
 
-    def process_all_files(self, mapping_path: Path) -> None:
-        """Process all files based on the mapping file."""
+    def _run_file_tasks(self, tasks: List[tuple], id_mapping: Dict[str, str], consent_status_mapping: Dict[str, str], max_workers: int = None) -> Iterator[int]:
+        """Run update_file_ids for each task, yielding the mapping row index of every finished file."""
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        
+        # A file listed on several rows is only processed once
+        rows_by_file: Dict[Path, List[tuple]] = {}
+        for task in tasks:
+            rows_by_file.setdefault(task[1], []).append(task)
+        
+        id_lookup = _build_id_lookup(id_mapping, consent_status_mapping)
+        if max_workers <= 1 or len(rows_by_file) <= 1:
+            for idx, source_path, source_id, id_type, file_context in tasks:
+                if not self.is_running:
+                    self._send_status("Processing stopped by user")
+                    return
+                self.update_file_ids(source_path, source_id, id_mapping, consent_status_mapping, id_type, file_context, id_lookup)
+                yield idx
+            return
+        
+        # Each file is independent once the mappings exist, so spread them over worker
+        # processes. Only the combined lookup table is shipped to every worker, once via the
+        # initializer: its key index and parallel hash/consent arrays are all update_file_ids
+        # needs, so the two mapping dicts are neither pickled nor rebuilt per worker.
+        self._send_status(f"Processing {len(rows_by_file)} files with up to {max_workers} worker processes")
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(rows_by_file)), initializer=_init_worker,
+                                 initargs=(id_lookup,)) as executor:
+            futures = {}
+            for source_path, file_tasks in rows_by_file.items():
+                if source_path in self.processed_files:
+                    self._send_status(f"Skipping {source_path} - already processed")
+                    yield from (task[0] for task in file_tasks)
+                    continue
+                _, _, source_id, id_type, file_context = file_tasks[0]
+                future = executor.submit(_process_file_worker, source_path, source_id, id_type, file_context)
+                futures[future] = (source_path, file_tasks)
+            
+            stopped = False
+            first_error = None
+            try:
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    source_path, file_tasks = futures[future]
+                    try:
+                        not_hashed_ids = future.result()
+                    except Exception as e:
+                        # Files other workers are already on still finish and are rewritten on
+                        # disk, so keep collecting them to record them as processed; files not
+                        # started yet are dropped, and the first failure is raised at the end
+                        if first_error is None:
+                            first_error = e
+                            for pending in futures:
+                                pending.cancel()
+                        continue
+                    self.not_hashed_ids |= not_hashed_ids
+                    self.processed_files.add(source_path)
+                    self._send_status(f"Successfully updated {source_path}")
+                    yield from (task[0] for task in file_tasks)
+                    
+                    if not self.is_running and not stopped:
+                        # Files already running are allowed to finish; the rest are dropped
+                        stopped = True
+                        self._send_status("Processing stopped by user")
+                        for pending in futures:
+                            pending.cancel()
+            finally:
+                for pending in futures:
+                    pending.cancel()
+        if first_error is not None:
+            raise first_error
+
+    def process_all_files(self, mapping_path: Path, max_workers: int = None) -> None:
+        """Process all files based on the mapping file.
+        
+        Source files are processed in parallel by up to max_workers processes
+        (defaults to the number of CPUs); use max_workers=1 to process them serially.
+        """
         self.is_running = True
         self._send_status(f"Starting processing with mapping file: {mapping_path}")
         
@@ -452,44 +1065,43 @@ class IDProcessor:
         # Read mapping file
         try:
             if mapping_path.suffix.lower() == '.csv':
-                mapping_df = pd.read_csv(mapping_path)
+                # Arrow's parser with NumPy-backed columns, so blank cells stay NaN as before
+                mapping_df = pd.read_csv(mapping_path, engine='pyarrow' if pa is not None else 'c')
             else:
-                mapping_df = pd.read_excel(mapping_path, engine='openpyxl')
+                # Same engines as read_file: calamine for .xlsx when installed, xlrd for .xls
+                engine = _XLSX_READ_ENGINE if mapping_path.suffix.lower() == '.xlsx' else 'xlrd'
+                mapping_df = pd.read_excel(mapping_path, engine=engine)
                 
             # Initialize or update the processed column
             if 'processed' not in mapping_df.columns:
                 # If the column doesn't exist, add it and set all values to False
                 mapping_df.loc[:, 'processed'] = False
                 # Save the updated mapping file with the new column
-                if mapping_path.suffix.lower() == '.csv':
-                    mapping_df.to_csv(mapping_path, index=False)
-                else:
-                    mapping_df.to_excel(mapping_path, index=False)
+                self._save_mapping_file(mapping_df, mapping_path)
                 self._send_status("Added 'processed' column to mapping file to record file status")
             else:
-                # Convert existing processed column to boolean, treating NaN as False
-                # Handle string values properly: "False" -> False, "True" -> True
-                def convert_to_bool(val):
-                    if pd.isna(val) or val == '' or val == 'False' or val == 'false' or val is False or val == 0:
-                        return False
-                    elif val == 'True' or val == 'true' or val is True or val == 1:
-                        return True
-                    else:
-                        return False  # Default to False for any unexpected values
-                
-                mapping_df['processed'] = mapping_df['processed'].apply(convert_to_bool)
+                # Convert existing processed column to boolean in one vectorized pass: True, 1 and
+                # "True"/"true" mean processed; NaN, "False" and any unexpected value mean not processed
+                # (isin matches 1 and 1.0 through True as they hash equal)
+                mapping_df['processed'] = mapping_df['processed'].isin([True, 'True', 'true'])
                 
             self._send_status(f"Successfully read mapping file with {len(mapping_df)} entries")
         except Exception as e:
             raise ValueError(f"Could not read mapping file {mapping_path}: {str(e)}")
-            
-        required_cols = ['mapping_file', 'mapping_id', 'source_file', 'source_id']
-        if not all(col in mapping_df.columns for col in required_cols):
-            raise ValueError(f"Missing required columns {required_cols} in {mapping_path}")
+        
+        if not set(self.CONFIG_COLUMNS).issubset(mapping_df.columns):
+            raise ValueError(f"Missing required columns {self.CONFIG_COLUMNS} in {mapping_path}")
+        
+        # Files finished by a run that was interrupted before it saved the mapping file
+        # are recorded in the checkpoint; mark them processed so they are not redone
+        checkpoint_path = mapping_path.with_name(mapping_path.name + '.progress.json')
+        processed_indices = self._load_checkpoint(checkpoint_path, mapping_df)
+        if processed_indices:
+            mapping_df.loc[processed_indices, 'processed'] = True
+            self._send_status(f"Resumed {len(processed_indices)} processed files from {checkpoint_path}")
         
         # Find all files using paths from mapping file
         files = self.find_files(mapping_df)
-        total_files = len(files)
         
         # Get unprocessed rows using boolean indexing
         unprocessed_rows = mapping_df[mapping_df['processed'] == False]
@@ -501,83 +1113,71 @@ class IDProcessor:
         
         if len(unprocessed_rows) == 0:
             self._send_status("No files to process - all files are marked as processed")
+            if processed_indices:
+                self._save_mapping_file(mapping_df, mapping_path)
+                checkpoint_path.unlink(missing_ok=True)
             if self.progress_callback:
                 self.progress_callback(100)
             return
         
-        # Create backups of source files before modification
-        backups = {}
-        for i, (_, row) in enumerate(unprocessed_rows.iterrows()):
-            source_path = Path(row['source_file'])
-            if source_path.name != mapping_df['mapping_file'].iloc[0] and not row['processed']:
-                backups[source_path] = self.create_backup(source_path)
-                self._send_status(f"Created backup of {source_path}")
-            if self.progress_callback:
-                self.progress_callback(int((i / total_files) * 20))  # First 20% for backups
-        
+        # Source files are not copied up front: update_file_ids writes each new file
+        # beside the original and then renames the original to <name>.backup
+        id_mapping = None
         try:
             # First, get the mapping file to establish ID relationships
             # Get mapping file from unprocessed rows
             mapping_file = unprocessed_rows['mapping_file'].iloc[0]
-            mapping_file_path = next(f for f in files if f.name == Path(mapping_file).name)
+            # Resolve files by name with one dict instead of scanning the list for every row
+            files_by_name = {f.name: f for f in files}
+            mapping_file_path = files_by_name[Path(mapping_file).name]
+            
+            # Collect the work for each source file, and the distinct file contexts. Mappings for
+            # every file context are merged up front so the files can be processed independently
+            # of each other; blank or NaN contexts build the same keys as the base mapping.
+            tasks = []
+            contexts = {}
+            for idx, row in unprocessed_rows.iterrows():
+                source_file = row['source_file']
+                source_id = row['source_id']
+                source_path = files_by_name[Path(source_file).name]
+                
+                if source_path.name != mapping_file and not row['processed']:  # Skip mapping file and processed files
+                    # Extract id_type and source_context from the individual row
+                    id_type = row.get('id_type', source_id) if 'id_type' in row else None
+                    file_context = row.get('source_context', None) if 'source_context' in row else None
+                    
+                    # File-specific ID mappings are needed for each context
+                    if file_context is not None:
+                        contexts.update(dict.fromkeys(_context_parts(file_context)))
+                    
+                    tasks.append((idx, source_path, source_id, id_type, file_context))
             
             # Create ID mapping based on relationships in mapping file
             self._send_status("Creating ID mappings from relationships...")
-            # Don't extract source_context from mapping_df - we'll use individual file contexts
-            id_mapping, consent_status_mapping, person_mapping = self.create_id_mapping(mapping_file_path, mapping_df, None)
+            id_mapping, consent_status_mapping, person_mapping = self._build_id_mappings(mapping_file_path, mapping_df, list(contexts))
             self._send_status(f"Created {len(id_mapping)} ID mappings")
             if self.progress_callback:
                 self.progress_callback(25)  # 25% after creating ID mapping
             
             # Process each source file
-            total_rows = len(unprocessed_rows)
+            total_rows = max(len(tasks), 1)
             processed_files = 0
             
-            for i, (idx, row) in enumerate(unprocessed_rows.iterrows()):
-                if not self.is_running:
-                    self._send_status("Processing stopped by user")
-                    break
+            for idx in self._run_file_tasks(tasks, id_mapping, consent_status_mapping, max_workers):
+                processed_files += 1
+                # Update processed status in the DataFrame
+                mapping_df.loc[idx, 'processed'] = True
                 
-                source_file = row['source_file']
-                source_id = row['source_id']
-                source_path = next(f for f in files if f.name == Path(source_file).name)
+                # Record progress in the small checkpoint file; the mapping file itself is
+                # only rewritten once, when processing ends
+                processed_indices.append(idx)
+                self._write_checkpoint(checkpoint_path, mapping_df, processed_indices)
                 
-                if source_path.name != mapping_file and not row['processed']:  # Skip mapping file and processed files
-                    # Extract id_type and source_context from the individual row
-                    id_type = row.get('id_type', source_id) if 'id_type' in row else None
-                    file_context = row.get('source_context', None) if 'source_context' in row else None
-                    
-                    # Create file-specific ID mappings if needed
-                    if file_context is not None:
-                        # Create a new mapping for this specific file context
-                        file_id_mapping, file_consent_mapping, _ = self.create_id_mapping(mapping_file_path, mapping_df, file_context)
-                        # Merge with existing mappings
-                        id_mapping.update(file_id_mapping)
-                        consent_status_mapping.update(file_consent_mapping)
-                    
-                    self.update_file_ids(source_path, source_id, id_mapping, consent_status_mapping, id_type, file_context)
-                    processed_files += 1
-                    # Update processed status in the DataFrame
-                    mapping_df.loc[idx, 'processed'] = True
-                    
-                    # Save the updated mapping file after each successful file processing
-                    if mapping_path.suffix.lower() == '.csv':
-                        mapping_df.to_csv(mapping_path, index=False)
-                    else:
-                        mapping_df.to_excel(mapping_path, index=False)
-                    self._send_status(f"Updated processing status in mapping file")
-                    
                 if self.progress_callback:
                     # Progress from 25% to 90% during file processing
-                    progress = 25 + int((i + 1) / total_rows * 65)
+                    progress = 25 + int(processed_files / total_rows * 65)
                     self.progress_callback(progress)
 
-             # Update lookup table after each file is processed
-            lookup_df = self.create_lookup_table(id_mapping, consent_status_mapping, person_mapping)
-            lookup_path = Path('id_lookup_table.csv')
-            lookup_df.to_csv(lookup_path, index=False)
-            self._send_status(f"Updated lookup table with {len(lookup_df)} entries")
-
             if self.progress_callback:
                 self.progress_callback(100)  # Complete
             
@@ -592,58 +1192,107 @@ class IDProcessor:
             raise
         finally:
             self.is_running = False
+            if id_mapping is not None:
+                # Written here so the hashes and unmatched IDs of every file finished so far
+                # are kept even when a later file fails
+                lookup_df = self.create_lookup_table(id_mapping, consent_status_mapping, person_mapping)
+                self._write_lookup_table(lookup_df, Path('id_lookup_table.csv'))
+                self._send_status(f"Updated lookup table with {len(lookup_df)} entries")
+            if processed_indices:
+                # Save the processing status once, including after a stop or an error
+                self._save_mapping_file(mapping_df, mapping_path)
+                self._send_status(f"Updated processing status in mapping file")
+                checkpoint_path.unlink(missing_ok=True)
+
+    def _save_mapping_file(self, mapping_df: pd.DataFrame, mapping_path: Path) -> None:
+        """Write the mapping file back in its own format."""
+        suffix = mapping_path.suffix.lower()
+        if suffix == '.csv':
+            self._write_csv(mapping_df, mapping_path)
+        elif suffix == '.xlsx':
+            self._write_xlsx(mapping_df, mapping_path)
+        else:
+            mapping_df.to_excel(mapping_path, index=False)
+
+    def _write_checkpoint(self, checkpoint_path: Path, mapping_df: pd.DataFrame, processed_indices: List[int]) -> None:
+        """Record the processed mapping rows in the progress checkpoint."""
+        # Rows are stored by what they point at rather than by position, so the checkpoint still
+        # matches after rows of the mapping file are added, removed or reordered
+        rows = [list(row) for row in _checkpoint_rows(mapping_df.loc[processed_indices])]
+        _write_json(checkpoint_path, {'processed_rows': rows})
+
+    def _load_checkpoint(self, checkpoint_path: Path, mapping_df: pd.DataFrame) -> List[int]:
+        """Return the mapping rows recorded as processed in a progress checkpoint."""
+        if not checkpoint_path.exists():
+            return []
+        try:
+            with open(checkpoint_path) as f:
+                processed_rows = {tuple(row) for row in json.load(f)['processed_rows']}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._send_status(f"Warning: Could not read progress checkpoint {checkpoint_path}: {str(e)}")
+            return []
+        return [idx for idx, row in zip(mapping_df.index, _checkpoint_rows(mapping_df)) if row in processed_rows]
+
+    def build_resolver(self, mapping_table: pd.DataFrame) -> 'MappingResolver':
+        """Return a resolver for many lookups against one mapping table.
+        
+        Its indexes are built once; build a new resolver after changing the table.
+        """
+        return MappingResolver(mapping_table)
+
+    def _resolver_for(self, mapping_table: pd.DataFrame) -> 'MappingResolver':
+        """Return the resolver for a mapping table, reusing it only for tables this class read."""
+        # Tables from _read_mapping_table are never modified and are replaced when their file
+        # changes, so their indexes can be kept. A caller's table may be edited in place between
+        # calls, so it always gets fresh indexes and answers.
+        if not any(mapping_table is table for table in self._mapping_table_cache.values()):
+            return MappingResolver(mapping_table)
+        cached = self._resolver_cache
+        if cached is None or cached.mapping_table is not mapping_table:
+            cached = self._resolver_cache = MappingResolver(mapping_table)
+        return cached
 
     def resolve_id_conflicts(self, mapping_table: pd.DataFrame, id_value: str, id_type: str, source_context: str = None) -> str:
         """Resolve conflicts when the same ID appears for multiple people."""
-        # Filter records for this specific ID and type
-        id_records = mapping_table[
-            (mapping_table['id_value'].astype(str) == str(id_value)) & 
-            (mapping_table['id_type'] == id_type)
-        ]
-        
-        if len(id_records) == 0:
-            return None
-            
-        # If source_context is provided, prefer matching context
-        if source_context:
-            context_matches = id_records[id_records['source_context'] == source_context]
-            if len(context_matches) > 0:
-                id_records = context_matches
-        
-        # Sort by priority (lower number = higher priority), then by effective_date
-        id_records = id_records.sort_values(['priority', 'effective_date'], ascending=[True, False])
-        
-        # Return the person_id of the highest priority record
-        return id_records.iloc[0]['person_id']
+        return self._resolver_for(mapping_table).resolve_id_conflicts(id_value, id_type, source_context)
 
     def get_person_for_id(self, mapping_table: pd.DataFrame, id_value: str, id_type: str, source_context: str = None) -> tuple:
         """Get person_id and consent_status for a given ID in a specific context."""
-        person_id = self.resolve_id_conflicts(mapping_table, id_value, id_type, source_context)
-        
-        if person_id is None:
-            return None, 'ID not found'
-            
-        # Get consent status for this person
-        person_records = mapping_table[mapping_table['person_id'] == person_id]
-        if len(person_records) > 0:
-            consent_status = person_records.iloc[0]['consent_status']
-            return person_id, consent_status
-            
-        return person_id, 'ID not found'
+        return self._resolver_for(mapping_table).get_person_for_id(id_value, id_type, source_context)
 
     def validate_id_mapping_structure(self, mapping_table: pd.DataFrame) -> None:
         """Validate the new mapping table structure."""
-        required_columns = ['person_id', 'id_value', 'id_type', 'source_context', 'priority', 'consent_status']
-        missing_columns = [col for col in required_columns if col not in mapping_table.columns]
+        missing_columns = set(self.MAPPING_TABLE_COLUMNS).difference(mapping_table.columns)
         
         if missing_columns:
+            missing_columns = [col for col in self.MAPPING_TABLE_COLUMNS if col in missing_columns]
             raise ValueError(f"Missing required columns in mapping table: {missing_columns}")
             
-        # Check for invalid consent statuses
+        # Check for invalid consent statuses; only the count is needed, so the mask is summed
+        # instead of selecting the invalid rows into a new frame
         valid_statuses = ['granted', 'revoked', 'none', 'ID not found']
-        invalid_statuses = mapping_table[~mapping_table['consent_status'].isin(valid_statuses)]
-        if len(invalid_statuses) > 0:
-            self._send_status(f"Warning: Found {len(invalid_statuses)} records with invalid consent status")
+        invalid_count = int((~mapping_table['consent_status'].isin(valid_statuses)).sum())
+        if invalid_count > 0:
+            self._send_status(f"Warning: Found {invalid_count} records with invalid consent status")
+
+
+# Lookup table shared by every file in a worker process, set once by _init_worker
+_worker_lookup = None
+
+
+def _init_worker(id_lookup: pd.DataFrame) -> None:
+    """Store the combined ID lookup table in a worker process."""
+    global _worker_lookup
+    _worker_lookup = id_lookup
+
+
+def _process_file_worker(file_path: Path, id_column: str, id_type: str = None, source_context: str = None) -> Set[str]:
+    """Process one source file in a worker process and return the IDs that were not hashed."""
+    processor = IDProcessor(load_lookup_table=False)
+    processor.is_running = True
+    # The mapping dicts are only needed to build the lookup table, which is passed in
+    processor.update_file_ids(file_path, id_column, None, None, id_type, source_context, _worker_lookup)
+    return processor.not_hashed_ids
 
 
 def main():
@@ -652,13 +1301,21 @@ def main():
     
     parser = argparse.ArgumentParser(description='Hash IDs in CSV/Excel files based on mapping file.')
     parser.add_argument('mapping_file', type=str, help='Path to the mapping CSV file')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of source files to process in parallel (default: number of CPUs; 1 = serial)')
+    parser.add_argument('--hash-algo', choices=sorted(_HASHERS), default=IDProcessor.HASH_ALGO,
+                        help=f'Hash algorithm for new lookup tables (default: {IDProcessor.HASH_ALGO})')
+    parser.add_argument('--replace-lookup-table', action='store_true',
+                        help='Replace an existing id_lookup_table.csv made with a different hash algorithm')
     
     args = parser.parse_args()
     mapping_path = Path(args.mapping_file)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
     
     try:
-        processor = IDProcessor()
-        processor.process_all_files(mapping_path)
+        processor = IDProcessor(hash_algo=args.hash_algo, replace_lookup_table=args.replace_lookup_table)
+        processor.process_all_files(mapping_path, max_workers=args.workers)
         print("Successfully processed all files.")
     except Exception as e:
         print(f"Error processing files: {str(e)}")